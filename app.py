@@ -1,12 +1,20 @@
 # app.py
 import streamlit as st
-from PyPDF2 import PdfReader
+import fitz  # PyMuPDF
 import docx
 import io
 import re
-from one_mark import generate_one_mark_questions
-from six_marks import generate_six_mark_questions
-from twelve_marks import generate_twelve_mark_questions
+import asyncio
+import httpx
+from one_mark import generate_one_mark_questions_for_units, renumber_questions
+from six_marks import generate_six_mark_questions_async
+from twelve_marks import generate_twelve_mark_questions_async
+
+# Syllabus unit headings with the rest of their line: "UNIT I: ...", "Unit 2 ..."
+_UNIT_SPLIT_RE = re.compile(r"(\bUNIT\s+(?:[IVXLCDM]+|\d+)\b[^\n]*)", re.IGNORECASE)
+# Lines that only carry the unit duration, e.g. "9 Hrs"
+_HRS_RE = re.compile(r"^[ \t]*\d+[ \t]*(?:Hrs|Hours)[ \t]*\r?$", re.IGNORECASE | re.MULTILINE)
+_WS_RE = re.compile(r"\s+")
 
 st.set_page_config(page_title="Question Paper Generator", layout="wide")
 st.title("📘 Question Paper Generator")
@@ -38,39 +46,73 @@ with col4:
 # ---------------------------
 # Helper function to extract text
 # ---------------------------
+@st.cache_data(show_spinner=False)
+def _extract_text(content: bytes, file_type: str, file_name: str):
+    """
+    Extract text from raw file bytes. Cached on the bytes, so re-generating
+    from the same upload skips extraction. Returns None for unsupported types.
+    """
+    if file_type == "application/pdf":
+        with fitz.open(stream=content, filetype="pdf") as pdf_doc:
+            return "\n".join(page.get_text("text") for page in pdf_doc)
+        
+    elif file_type == "text/plain":
+        return content.decode("utf-8")
+        
+    elif "word" in file_type or file_name.endswith('.docx'):
+        doc = docx.Document(io.BytesIO(content))
+        return "\n".join(paragraph.text for paragraph in doc.paragraphs)
+        
+    return None
+
 def extract_text_from_file(uploaded_file):
     """Extract text from PDF, TXT, or DOCX files."""
     if uploaded_file is None:
         return ""
     
-    file_type = uploaded_file.type.lower()
-    content = uploaded_file.read()
-    
     try:
-        if file_type == "application/pdf":
-            pdf_reader = PdfReader(io.BytesIO(content))
-            text = ""
-            for page in pdf_reader.pages:
-                text += page.extract_text() + "\n"
-            return text
-            
-        elif file_type == "text/plain":
-            return content.decode("utf-8")
-            
-        elif "word" in file_type or uploaded_file.name.endswith('.docx'):
-            doc = docx.Document(io.BytesIO(content))
-            text = ""
-            for paragraph in doc.paragraphs:
-                text += paragraph.text + "\n"
-            return text
-            
-        else:
-            st.error(f"Unsupported file type: {uploaded_file.type}")
-            return ""
-            
+        text = _extract_text(uploaded_file.getvalue(), uploaded_file.type.lower(), uploaded_file.name)
     except Exception as e:
         st.error(f"Error reading file: {str(e)}")
         return ""
+    
+    if text is None:
+        st.error(f"Unsupported file type: {uploaded_file.type}")
+        return ""
+    return text
+
+# ---------------------------
+# Run all question generators concurrently
+# ---------------------------
+async def generate_all_questions(book_text, units, questions_per_unit, difficulty, status):
+    """
+    Generate the one-, six- and twelve-mark parts at the same time, since
+    they only share the book text and units. Returns the three results in
+    that order; a part that failed yields its exception instead.
+    """
+    async def _track(label, coro):
+        try:
+            result = await coro
+        except Exception:
+            status.write(f"⚠️ {label} failed")
+            raise
+        status.write(f"✅ {label} ready")
+        return result
+    
+    # One client for every Groq request, so TLS connections are reused
+    async with httpx.AsyncClient(timeout=60) as client:
+        return await asyncio.gather(
+            _track("One-mark questions", generate_one_mark_questions_for_units(
+                book_text, units, questions_per_unit, difficulty, client=client
+            )),
+            _track("Six-mark questions", generate_six_mark_questions_async(
+                book_text, units, difficulty, client=client
+            )),
+            _track("Twelve-mark questions", generate_twelve_mark_questions_async(
+                book_text, units, difficulty, client=client
+            )),
+            return_exceptions=True
+        )
 
 # ---------------------------
 # Generate Question Paper
@@ -87,59 +129,14 @@ if syllabus_file and book_file and st.button("Generate Complete Question Paper",
     
     st.success("Content extracted successfully!")
     
-    # Split syllabus into units - IMPROVED PARSING
-    lines = syllabus_text.splitlines()
-    units = []
-    current_unit = ""
-    
-    # Better regex pattern for detecting units
-    unit_patterns = [
-        r"UNIT\s+[IVXLCDM]+",  # UNIT I, UNIT II, etc.
-        r"Unit\s+[IVXLCDM]+",  # Unit I, Unit II, etc.
-        r"UNIT\s+\d+",         # UNIT 1, UNIT 2, etc.
-        r"Unit\s+\d+"          # Unit 1, Unit 2, etc.
+    # Split syllabus into units. With a capturing group, split() returns
+    # [preamble, heading, body, heading, body, ...]
+    parts = _UNIT_SPLIT_RE.split(_HRS_RE.sub("", syllabus_text))
+    units = [
+        _WS_RE.sub(" ", heading + " " + body).strip()
+        for heading, body in zip(parts[1::2], parts[2::2])
     ]
     
-    for line in lines:
-        line_upper = line.upper()
-        is_unit_line = False
-        
-        # Check if line contains any unit pattern
-        for pattern in unit_patterns:
-            if re.search(pattern, line_upper):
-                is_unit_line = True
-                break
-        
-        # Also check for common unit indicators
-        if not is_unit_line and ("UNIT" in line_upper or "Unit" in line_upper):
-            # Check if followed by Roman numeral or number
-            if re.search(r"UNIT.*[IVXLCDM1-9]", line_upper):
-                is_unit_line = True
-        
-        if is_unit_line:
-            if current_unit:
-                units.append(current_unit.strip())
-            current_unit = line.strip()
-        elif current_unit and line.strip():
-            # Skip lines that are just hours (e.g., "9 Hrs", "9 Hours")
-            if not re.search(r"^\d+\s*(Hrs|Hours|hrs|hours)$", line.strip()):
-                current_unit += " " + line.strip()
-    
-    if current_unit:
-        units.append(current_unit.strip())
-    
-    # Clean up units - remove excessive whitespace
-    cleaned_units = []
-    for unit in units:
-        # Remove multiple spaces
-        unit = re.sub(r'\s+', ' ', unit)
-        # Remove trailing/leading whitespace
-        unit = unit.strip()
-        if unit:  # Only add non-empty units
-            cleaned_units.append(unit)
-    
-    units = cleaned_units
-    
     # If no units found, create default units
     if not units:
         units = [
@@ -160,71 +157,75 @@ if syllabus_file and book_file and st.button("Generate Complete Question Paper",
     # Initialize tabs
     tab1, tab2, tab3, tab4 = st.tabs(["📝 Complete Paper", "🔤 One-Mark MCQs", "📚 Six-Mark Questions", "📖 Twelve-Mark Questions"])
     
-    # Generate One-Mark Questions (Q1-Q10)
-    with tab1, st.spinner("Generating one-mark questions..."):
+    # Generate all parts concurrently
+    with tab1, st.status("Generating questions...", expanded=True) as status:
+        results, six_mark_questions, twelve_mark_questions = asyncio.run(
+            generate_all_questions(book_text, units, questions_per_unit, difficulty, status)
+        )
+        status.update(label="Questions generated", state="complete", expanded=False)
+    
+    # One-Mark Questions (Q1-Q10)
+    with tab1:
         all_one_mark_questions = []
         question_counter = 1
         
-        for i, unit in enumerate(units):
-            try:
-                questions = generate_one_mark_questions(
-                    book_text, 
-                    unit, 
-                    questions_per_unit, 
-                    difficulty,
-                    start_qno=question_counter
-                )
-                if "No new questions" not in questions:
-                    all_one_mark_questions.append((unit, questions))
-                    question_counter += questions_per_unit
-            except Exception as e:
-                st.error(f"Error generating one-mark questions for {unit}: {str(e)[:100]}...")
+        # A failure outside the per-unit calls fails every unit
+        if isinstance(results, Exception):
+            results = [results] * len(units)
+        
+        # Units were requested concurrently; numbering is assigned
+        # here in unit order so it stays deterministic
+        for unit, result in zip(units, results):
+            if isinstance(result, Exception):
+                st.error(f"Error generating one-mark questions for {unit}: {str(result)[:100]}...")
                 # Fallback
-                fallback = f"**{unit}**\n\n"
+                fallback = [f"**{unit}**\n\n"]
                 for q in range(questions_per_unit):
-                    fallback += f"Q{question_counter}. [Question generation failed - please try again]\nA. Option A\nB. Option B\nC. Option C\nD. Option D\n\n"
+                    fallback.append(f"Q{question_counter}. [Question generation failed - please try again]\nA. Option A\nB. Option B\nC. Option C\nD. Option D\n\n")
                     question_counter += 1
-                all_one_mark_questions.append((unit, fallback))
+                all_one_mark_questions.append((unit, "".join(fallback)))
+            elif "No new questions" not in result:
+                all_one_mark_questions.append((unit, renumber_questions(result, question_counter)))
+                question_counter += questions_per_unit
     
-    # Generate Six-Mark Questions (Q11-Q18)
-    with tab1, st.spinner("Generating six-mark questions..."):
-        try:
-            six_mark_questions = generate_six_mark_questions(book_text, units, difficulty)
-        except Exception as e:
-            st.error(f"Error generating six-mark questions: {str(e)[:100]}...")
+    # Six-Mark Questions (Q11-Q18)
+    with tab1:
+        if isinstance(six_mark_questions, Exception):
+            st.error(f"Error generating six-mark questions: {str(six_mark_questions)[:100]}...")
             # Fallback six-mark questions
-            six_mark_questions = ""
-            for i in range(11, 19):
-                six_mark_questions += f"Q{i}. Explain the key concepts from the syllabus with examples.\n\n"
+            six_mark_questions = "".join(
+                f"Q{i}. Explain the key concepts from the syllabus with examples.\n\n"
+                for i in range(11, 19)
+            )
     
-    # Generate Twelve-Mark Questions (Q19-Q28)
-    with tab1, st.spinner("Generating twelve-mark questions..."):
-        try:
-            twelve_mark_questions = generate_twelve_mark_questions(book_text, units, difficulty)
-        except Exception as e:
-            st.error(f"Error generating twelve-mark questions: {str(e)[:100]}...")
+    # Twelve-Mark Questions (Q19-Q28)
+    with tab1:
+        if isinstance(twelve_mark_questions, Exception):
+            st.error(f"Error generating twelve-mark questions: {str(twelve_mark_questions)[:100]}...")
             # Fallback twelve-mark questions
-            twelve_mark_questions = ""
-            for i in range(19, 29):
-                twelve_mark_questions += f"Q{i}. Discuss in detail the important concepts and applications from the syllabus with comprehensive analysis and examples.\n\n"
+            twelve_mark_questions = "".join(
+                f"Q{i}. Discuss in detail the important concepts and applications from the syllabus with comprehensive analysis and examples.\n\n"
+                for i in range(19, 29)
+            )
     
     # Display Complete Paper in Tab 1
     with tab1:
         st.subheader("📝 Complete Question Paper")
         
-        full_paper = "**PART A - One Mark Questions (10 x 1 = 10 Marks)**\n\n"
+        paper_parts = ["**PART A - One Mark Questions (10 x 1 = 10 Marks)**\n\n"]
         
         # Add one-mark questions
         for unit, questions in all_one_mark_questions:
             unit_name = unit.split(':')[0] if ':' in unit else unit
-            full_paper += f"**{unit_name}**\n"
-            full_paper += questions + "\n\n"
+            paper_parts.append(f"**{unit_name}**\n{questions}\n\n")
+        
+        paper_parts.append("\n**PART B - Six Mark Questions (8 x 6 = 48 Marks)**\n\n")
+        paper_parts.append(six_mark_questions)
         
-        full_paper += "\n**PART B - Six Mark Questions (8 x 6 = 48 Marks)**\n\n"
-        full_paper += six_mark_questions
+        paper_parts.append("\n**PART C - Twelve Mark Questions (10 x 12 = 120 Marks)**\n\n")
+        paper_parts.append(twelve_mark_questions)
         
-        full_paper += "\n**PART C - Twelve Mark Questions (10 x 12 = 120 Marks)**\n\n"
-        full_paper += twelve_mark_questions
+        full_paper = "".join(paper_parts)
         
         st.text_area("Full Question Paper", full_paper, height=1000, key="full_paper")
         
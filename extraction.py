@@ -1,21 +1,23 @@
 # extraction.py
 
-from PyPDF2 import PdfReader
+import fitz  # PyMuPDF
 import re
 import numpy as np
+import streamlit as st
 from sentence_transformers import SentenceTransformer
-from sklearn.metrics.pairwise import cosine_similarity
 
 
 # ---------------------------
 # Extract PDF text
 # ---------------------------
 def extract_pdf_text(pdf_file) -> str:
-    reader = PdfReader(pdf_file)
-    text = ""
-    for page in reader.pages:
-        text += page.extract_text() or ""
-    return text
+    # Accept a path or a file-like object (e.g. a Streamlit upload)
+    if hasattr(pdf_file, "read"):
+        doc = fitz.open(stream=pdf_file.read(), filetype="pdf")
+    else:
+        doc = fitz.open(pdf_file)
+    with doc:
+        return "".join(page.get_text("text") for page in doc)
 
 
 # ---------------------------
@@ -43,29 +45,65 @@ def split_units(syllabus_text: str) -> dict:
 # ---------------------------
 def chunk_text(text, chunk_size=400):
     words = text.split()
-    chunks = []
-    for i in range(0, len(words), chunk_size):
-        chunks.append(" ".join(words[i:i + chunk_size]))
-    return chunks
+    return [" ".join(words[i:i + chunk_size]) for i in range(0, len(words), chunk_size)]
+
+
+# ---------------------------
+# Cached model / book embeddings
+# ---------------------------
+@st.cache_resource(show_spinner=False)
+def _get_model():
+    return SentenceTransformer("all-MiniLM-L6-v2")
+
+
+@st.cache_data(show_spinner=False)
+def _embed_book(book_text: str, slice_size: int = 512):
+    # Keyed on the book text, so re-generating from the same book skips encoding
+    model = _get_model()
+    book_chunks = chunk_text(book_text)
+
+    # Encode slice by slice straight into one preallocated matrix, rather than
+    # letting encode() hold every batch output and stack them at the end
+    book_embeddings = np.empty(
+        (len(book_chunks), model.get_sentence_embedding_dimension()), dtype=np.float32
+    )
+    for start in range(0, len(book_chunks), slice_size):
+        book_embeddings[start:start + slice_size] = model.encode(
+            book_chunks[start:start + slice_size],
+            batch_size=32, convert_to_numpy=True, normalize_embeddings=True
+        )
+    return book_chunks, book_embeddings
 
 
 # ---------------------------
 # Map syllabus unit → book content
 # ---------------------------
 def map_syllabus_to_book(syllabus_units: dict, book_text: str) -> dict:
-    model = SentenceTransformer("all-MiniLM-L6-v2")
+    if not syllabus_units:
+        return {}
 
-    book_chunks = chunk_text(book_text)
-    book_embeddings = model.encode(book_chunks)
+    model = _get_model()
+    book_chunks, book_embeddings = _embed_book(book_text)
 
-    mapped = {}
+    unit_names = list(syllabus_units.keys())
+    unit_embeddings = model.encode(
+        [syllabus_units[unit] for unit in unit_names],
+        batch_size=32, convert_to_numpy=True, normalize_embeddings=True
+    )
 
-    for unit, unit_text in syllabus_units.items():
-        unit_embedding = model.encode([unit_text])
-        sims = cosine_similarity(unit_embedding, book_embeddings)[0]
+    # Embeddings are unit-normalized, so the dot product is the cosine similarity
+    sims = unit_embeddings @ book_embeddings.T
+
+    # Top-5 chunks per unit in linear time; argpartition leaves them unordered,
+    # so sort the 5 indices to keep the mapped text in book order
+    top_k = min(5, len(book_chunks))
+    top_idx = np.argpartition(-sims, top_k - 1, axis=1)[:, :top_k]
+    top_idx.sort(axis=1)
+
+    mapped = {}
 
-        top_idx = np.argsort(sims)[-5:]
-        mapped_chunks = [book_chunks[i] for i in top_idx]
+    for unit, unit_top_idx in zip(unit_names, top_idx):
+        mapped_chunks = [book_chunks[i] for i in unit_top_idx]
 
         mapped[unit] = "\n".join(mapped_chunks)
 
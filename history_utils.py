@@ -0,0 +1,30 @@
+# history_utils.py
+import json
+import hashlib
+
+try:
+    import orjson
+    json_loads = orjson.loads
+    json_dumps = orjson.dumps
+except ImportError:  # orjson is an optional speedup
+    json_loads = json.loads
+    def json_dumps(obj):
+        return json.dumps(obj).encode()
+
+
+# ---------------------------
+# Question hashing
+# ---------------------------
+def hash_question(q):
+    # Dedupe key only, so a fast 128-bit BLAKE2b digest is plenty
+    return hashlib.blake2b(q.strip().lower().encode(), digest_size=16).hexdigest()
+
+
+def legacy_hash_question(q):
+    # Histories written before the switch to BLAKE2b hold SHA-256 digests
+    return hashlib.sha256(q.strip().lower().encode()).hexdigest()
+
+
+def has_legacy_hashes(hashes):
+    # The digest length tags the algorithm: 64 hex chars is SHA-256
+    return any(len(q_hash) == 64 for q_hash in hashes)
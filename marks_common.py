@@ -0,0 +1,334 @@
+# marks_common.py
+# Shared by six_marks.py and twelve_marks.py, which differ only in their
+# prompts, question distribution and numbering.
+import os
+import re
+import random
+import asyncio
+import httpx
+import heapq
+from functools import lru_cache
+from dotenv import load_dotenv
+from history_utils import json_dumps, json_loads, hash_question, legacy_hash_question, has_legacy_hashes
+from rate_limit import RateLimitError, groq_rate_limiter, retry_with_exponential_backoff
+
+load_dotenv()
+
+GROQ_API_KEY = os.getenv("GROQ_API_KEY")
+BASE_URL = "https://api.groq.com/openai/v1/chat/completions"
+MODEL = "llama-3.1-8b-instant"
+# Re-scan the streamed text for question blocks every this many chunks
+STREAM_PARSE_EVERY = 8
+
+COMMON_WORDS = frozenset({'with', 'this', 'that', 'from', 'have', 'has', 'are', 'was', 'were', 'learning', 'machine'})
+
+_WORD_RE = re.compile(r'\b[a-z]{4,}\b')
+_SENTENCE_RE = re.compile(r'[^.]+')
+# A question runs from a "Q<n>" line up to the next one (or the end)
+_Q_BLOCK_RE = re.compile(r'^[ \t]*Q\s*\d+.*?(?=\n[ \t]*Q\s*\d+|\Z)', re.MULTILINE | re.DOTALL)
+_LINE_BREAK_RE = re.compile(r'\s*\n\s*')
+# The "Q<n>." label, including malformed ones like "Q17.5017"
+_Q_LABEL_RE = re.compile(r'^Q\s*\d+(?:\.\d+)?[.):]?\s*')
+
+HEADERS = {
+    "Authorization": f"Bearer {GROQ_API_KEY}",
+    "Content-Type": "application/json"
+}
+
+# ---------------------------
+# Text processing utilities
+# ---------------------------
+@lru_cache(maxsize=4)
+def _get_sentences(full_text: str):
+    """
+    Index the book once per text. Returns the stripped original sentences
+    and a map from each lowercase word to the ascending indices of the
+    sentences containing it. Every unit of every section scans the same book.
+    """
+    lower_text = full_text.lower()
+    # Lowercasing never adds or removes '.', so the n-th sentence of the
+    # lowercase copy is the n-th sentence of the original
+    sentences = tuple(match.group().strip() for match in _SENTENCE_RE.finditer(full_text))
+
+    postings = {}
+    for idx, match in enumerate(_SENTENCE_RE.finditer(lower_text)):
+        for word in set(_WORD_RE.findall(lower_text, *match.span())):
+            postings.setdefault(word, []).append(idx)
+    return sentences, postings
+
+def extract_relevant_content(full_text: str, unit: str, max_chars: int = 4000,
+                             max_keywords: int = 8, common_words=COMMON_WORDS):
+    """
+    Extract the portion of the book relevant to a unit, using up to
+    max_keywords words from the unit description as keywords.
+    """
+    # Get unit name and extract keywords
+    unit_lines = unit.split('\n')
+    unit_first_line = unit_lines[0].strip()
+    unit_name = unit_first_line.split(':')[0].strip().upper()
+
+    # Extract meaningful words from unit description
+    unit_description = ' '.join(unit_lines).lower()
+    words = _WORD_RE.findall(unit_description)
+
+    keywords = [word for word in words if word not in common_words][:max_keywords]
+
+    keywords.append(unit_name.lower().replace('unit ', ''))
+
+    # Match whole words: only words the index knows about can ever match
+    keyword_set = {keyword.lower() for keyword in keywords}
+
+    # Find sentences containing keywords, in book order. Merging the
+    # per-keyword sentence lists is lazy, so it stops at max_chars.
+    sentences, postings = _get_sentences(full_text)
+    relevant_sentences = []
+    total_len = 0
+    last_idx = -1
+
+    for idx in heapq.merge(*(postings.get(keyword, ()) for keyword in keyword_set)):
+        if idx == last_idx:
+            continue
+        last_idx = idx
+        sentence = sentences[idx]
+        relevant_sentences.append(sentence)
+        total_len += len(sentence) + 2  # Account for the '. ' joiner
+
+        if total_len > max_chars:
+            break
+
+    if not relevant_sentences:
+        return full_text[:3000]
+
+    return '. '.join(relevant_sentences)[:max_chars]
+
+# ---------------------------
+# History functions
+# ---------------------------
+def load_history(history_file: str):
+    # Hashes are held as sets in memory for O(1) membership checks
+    if not os.path.exists(history_file):
+        return {}
+    with open(history_file, "rb") as f:
+        return {unit: set(hashes) for unit, hashes in json_loads(f.read()).items()}
+
+def save_history(history_file: str, history):
+    with open(history_file, "wb") as f:
+        f.write(json_dumps({unit: sorted(hashes) for unit, hashes in history.items()}))
+
+def renumber_question(q: str, number: int):
+    """
+    Replace the model's "Q<n>." label with the paper's question number.
+    """
+    q_parts = q.split('.', 1)
+    if len(q_parts) > 1:
+        return f"Q{number}.{q_parts[1]}"
+    return f"Q{number}."
+
+# ---------------------------
+# API Call with Retry Logic
+# ---------------------------
+@retry_with_exponential_backoff
+async def make_groq_api_call(client: httpx.AsyncClient, body: dict, on_question=None):
+    """
+    Make a streaming API call to Groq with built-in retry logic for rate limits.
+    Returns the completion text.
+    on_question, if given, is called with each question block as soon as it
+    is complete; once it returns True the stream is closed, so the unused
+    tail is never generated.
+    """
+    await groq_rate_limiter.acquire()
+    async with client.stream("POST", BASE_URL, headers=HEADERS, json={**body, "stream": True}) as resp:
+        if resp.status_code != 200:
+            await resp.aread()
+            error_msg = resp.json().get("error", {}).get("message", resp.text)
+            if resp.status_code == 429:
+                raise RateLimitError.from_response(resp, error_msg)
+            raise Exception(f"Groq API Error: {resp.status_code} - {error_msg}")
+
+        parts = []
+        emitted = 0  # Question blocks already passed to on_question
+        async for line in resp.aiter_lines():
+            # Server-sent events: one "data: {json}" line per chunk
+            if not line.startswith("data:"):
+                continue
+            data = line[5:].strip()
+            if data == "[DONE]":
+                break
+            delta = json_loads(data)["choices"][0]["delta"].get("content")
+            if not delta:
+                continue
+            parts.append(delta)
+
+            if on_question and len(parts) % STREAM_PARSE_EVERY == 0:
+                # A block is complete once the next one has started
+                blocks = [match.group() for match in _Q_BLOCK_RE.finditer("".join(parts))]
+                for block in blocks[emitted:-1]:
+                    emitted += 1
+                    if on_question(block):
+                        # Leaving the block closes the connection mid-stream
+                        return "".join(parts)
+
+    content = "".join(parts)
+    if on_question:
+        for match in list(_Q_BLOCK_RE.finditer(content))[emitted:]:
+            if on_question(match.group()):
+                break
+    return content
+
+# ---------------------------
+# Generate descriptive questions
+# ---------------------------
+def _question_acceptor(unit_history, num_questions: int, first_qno: int, renumber, hash_renumbered: bool):
+    """
+    Build the on_question callback for one unit. Returns (accept, accepted,
+    new_hashes): accept(block) renumbers the block, drops repeats and
+    questions already in unit_history, and returns True once num_questions
+    have been accepted. unit_history itself is left untouched.
+    """
+    check_legacy = has_legacy_hashes(unit_history)
+    accepted = []
+    new_hashes = set()
+    seen_local = set()
+
+    def accept(block):
+        # Fold continuation lines into one line
+        q = _LINE_BREAK_RE.sub(' ', block.strip())
+        if len(accepted) >= num_questions or not q.startswith('Q'):
+            return len(accepted) >= num_questions
+        # Repeats within this response are dropped before they cost a hash
+        # and a history lookup; the model numbers a repeat differently, so
+        # compare the text without its label
+        local_key = _Q_LABEL_RE.sub('', q, count=1).lower()
+        if local_key in seen_local:
+            return False
+        seen_local.add(local_key)
+        q_clean = renumber(q, first_qno + len(accepted))
+        key = (q_clean if hash_renumbered else q).strip().lower()
+        q_hash = hash_question(key)
+        if q_hash in unit_history or (check_legacy and legacy_hash_question(key) in unit_history):
+            return False
+        accepted.append(q_clean)
+        new_hashes.add(q_hash)
+        return len(accepted) >= num_questions
+
+    return accept, accepted, new_hashes
+
+async def generate_mark_questions(
+    client: httpx.AsyncClient,
+    full_content: str,
+    units: list,
+    difficulty: str,
+    *,
+    marks_label: str,
+    marks: int,
+    distribution: list,
+    start_qno: int,
+    total_questions: int,
+    history_file: str,
+    max_tokens_per_question: int,
+    rules: str,
+    fallback_template: str,
+    max_keywords: int = 8,
+    common_words=COMMON_WORDS,
+    renumber=renumber_question,
+    hash_renumbered: bool = True
+):
+    """
+    Generate descriptive questions for one section of the paper.
+    distribution is a list of (unit_index, question_count) pairs; every
+    unit present is requested concurrently and owns the next question_count
+    numbers, so its questions can be vetted while they stream in. Units past
+    total_questions are not requested at all.
+    rules is the prompt's rule list, formatted with {difficulty}.
+    fallback_template fills numbers a unit could not, formatted with {n}.
+    Each unit's max_tokens scales with the number of questions it asks for.
+    Returns exactly total_questions questions numbered from start_qno.
+    """
+    history = load_history(history_file)
+    seed = random.randint(1000, 9999)
+
+    # Build one request per unit present in the syllabus
+    jobs = []
+    next_qno = start_qno
+    end_qno = start_qno + total_questions
+    for unit_idx, num_questions in distribution:
+        if unit_idx >= len(units):
+            continue
+        # Never request (or record in history) questions the section cuts
+        num_questions = min(num_questions, end_qno - next_qno)
+        if num_questions <= 0:
+            break
+
+        unit = units[unit_idx]
+        unit_name = unit.split(':')[0].strip()
+
+        # Extract relevant content
+        relevant_content = extract_relevant_content(
+            full_content, unit, max_keywords=max_keywords, common_words=common_words
+        )
+
+        system_msg = f"You are an expert university professor creating {marks_label} questions."
+
+        user_prompt = f"""Generate EXACTLY {num_questions} NEW {marks_label} descriptive questions.
+
+UNIT: {unit}
+DIFFICULTY: {difficulty}
+MARKS: {marks} marks each
+
+RELEVANT CONTENT:
+{relevant_content}
+
+Rules:
+{rules.format(difficulty=difficulty)}
+- Format strictly as:
+Q[number]. [Question text]
+
+[Seed: {seed}]
+"""
+
+        body = {
+            "model": MODEL,
+            "messages": [
+                {"role": "system", "content": system_msg},
+                {"role": "user", "content": user_prompt}
+            ],
+            "temperature": 0.8,
+            # Budget only for the questions this unit asks for
+            "max_tokens": max_tokens_per_question * num_questions
+        }
+        acceptor = _question_acceptor(
+            history.setdefault(unit_name, set()), num_questions, next_qno, renumber, hash_renumbered
+        )
+        jobs.append((unit_name, num_questions, next_qno, body, acceptor))
+        next_qno += num_questions
+
+    responses = await asyncio.gather(
+        *(make_groq_api_call(client, body, accept) for _, _, _, body, (accept, _, _) in jobs),
+        return_exceptions=True
+    )
+
+    all_questions = []
+    try:
+        for (unit_name, num_questions, first_qno, _, (_, accepted, new_hashes)), result in zip(jobs, responses):
+            if isinstance(result, httpx.HTTPError):
+                raise Exception(f"Network error for {unit_name}: {result}")
+            if isinstance(result, Exception):
+                raise Exception(f"Error generating {marks_label} questions for {unit_name}: {str(result)}")
+
+            history[unit_name].update(new_hashes)
+            all_questions.extend(accepted)
+            # Numbers this unit could not fill keep their place
+            all_questions.extend(
+                fallback_template.format(n=first_qno + i) for i in range(len(accepted), num_questions)
+            )
+    finally:
+        # Write history once per run; units processed before a failure are kept
+        save_history(history_file, history)
+
+    # Pad with generic questions when the syllabus has fewer units
+    if len(all_questions) < total_questions:
+        remaining = total_questions - len(all_questions)
+        base = start_qno + len(all_questions)
+        all_questions.extend(fallback_template.format(n=base + i) for i in range(remaining))
+
+    return "\n\n".join(all_questions[:total_questions])
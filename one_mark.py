@@ -1,74 +1,32 @@
 # one_mark.py
 import os
-import json
+import re
 import hashlib
 import random
-import time
-import requests
-from functools import wraps
+import asyncio
+import httpx
+from functools import lru_cache
 from dotenv import load_dotenv
+from history_utils import json_dumps, json_loads, hash_question, legacy_hash_question, has_legacy_hashes
+from rate_limit import RateLimitError, groq_rate_limiter, retry_with_exponential_backoff
 
 load_dotenv()
 
 GROQ_API_KEY = os.getenv("GROQ_API_KEY")
 BASE_URL = "https://api.groq.com/openai/v1/chat/completions"
 MODEL = "llama-3.1-8b-instant"
-HISTORY_FILE = "question_history.json"
+HISTORY_DIR = "history"  # One append-only <unit>.jsonl file per unit
+LEGACY_HISTORY_FILE = "question_history.json"  # Single-file history, imported once
+MAX_CONCURRENCY = 5  # Units generated in parallel
+
+# Sentence boundary: whitespace after terminal punctuation
+_SENT_RE = re.compile(r"(?<=[.!?])\s+")
 
 HEADERS = {
     "Authorization": f"Bearer {GROQ_API_KEY}",
     "Content-Type": "application/json"
 }
 
-# ---------------------------
-# Exponential Backoff Retry Decorator
-# ---------------------------
-def retry_with_exponential_backoff(
-    func=None,
-    initial_delay: float = 2.0,
-    exponential_base: float = 2.0,
-    jitter: bool = True,
-    max_retries: int = 5,
-    max_delay: float = 60.0,
-    errors_to_retry: tuple = (Exception,)
-):
-    """
-    Exponential backoff decorator for handling API rate limits.
-    """
-    def decorator(func):
-        @wraps(func)
-        def wrapper(*args, **kwargs):
-            delay = initial_delay
-            for i in range(max_retries + 1):  # +1 for the initial attempt
-                try:
-                    return func(*args, **kwargs)
-                except errors_to_retry as e:
-                    # Check if it's a rate limit error (429)
-                    is_rate_limit = "429" in str(e) or "Rate limit" in str(e) or "rate limit" in str(e)
-                    
-                    # If it's the last attempt or not a rate limit error, re-raise
-                    if i == max_retries or not is_rate_limit:
-                        raise e
-                    
-                    # Calculate sleep time with jitter
-                    sleep_time = delay
-                    if jitter:
-                        sleep_time = delay * (0.5 + random.random())
-                    if sleep_time > max_delay:
-                        sleep_time = max_delay
-                    
-                    print(f"⚠️ Rate limit hit. Retrying in {sleep_time:.2f} seconds... (Attempt {i+1}/{max_retries})")
-                    time.sleep(sleep_time)
-                    
-                    # Increase delay for next retry
-                    delay *= exponential_base
-            return func(*args, **kwargs)
-        return wrapper
-    
-    if func is None:
-        return decorator
-    return decorator(func)
-
 # ---------------------------
 # Text processing utilities
 # ---------------------------
@@ -82,9 +40,6 @@ def extract_relevant_content(full_text: str, unit: str, max_chars: int = 4000):
     unit_first_line = unit_lines[0].strip()
     unit_name = unit_first_line.split(':')[0].strip().upper()
     
-    # Extract important words from unit description (nouns, proper nouns)
-    import re
-    
     # Get all words from unit description
     unit_description = ' '.join(unit_lines).lower()
     # Extract meaningful words (3+ characters, not common stop words)
@@ -109,68 +64,139 @@ def extract_relevant_content(full_text: str, unit: str, max_chars: int = 4000):
         unit_num = unit_name.replace("UNIT", "").strip()
         keywords = generic_keywords.get(unit_num, [unit_name.lower()])
     
-    # Find sentences containing keywords
-    sentences = full_text.split('.')
+    # Match all keywords with one compiled alternation instead of K substring checks.
+    # Matching runs against a pre-lowercased copy of the text, so no IGNORECASE.
+    keyword_pattern = re.compile(
+        r"\b(?:" + "|".join(re.escape(k) for k in sorted({k.lower() for k in keywords}) if k) + r")\b"
+    )
+    
+    # Find sentences containing keywords. Lowercasing never adds or removes
+    # whitespace or punctuation, so both splits line up sentence for sentence.
+    sentences = _SENT_RE.split(full_text)
+    sentences_lower = _SENT_RE.split(full_text.lower())
     relevant_sentences = []
+    total_len = 0
     
-    for sentence in sentences:
-        sentence_lower = sentence.lower()
-        if any(keyword.lower() in sentence_lower for keyword in keywords):
-            relevant_sentences.append(sentence.strip())
+    for sentence, sentence_lower in zip(sentences, sentences_lower):
+        if keyword_pattern.search(sentence_lower):
+            sentence = sentence.strip()
+            relevant_sentences.append(sentence)
+            total_len += len(sentence) + 1  # Account for the ' ' joiner
         
         # Limit total characters
-        if sum(len(s) for s in relevant_sentences) > max_chars:
+        if total_len > max_chars:
             break
     
     if not relevant_sentences:
         # If no keyword matches, take first 3000 characters
         return full_text[:3000]
     
-    return '. '.join(relevant_sentences)[:max_chars]
+    # Sentences keep their own terminal punctuation
+    return ' '.join(relevant_sentences)[:max_chars]
 
 # ---------------------------
 # History functions
 # ---------------------------
-def load_history():
-    if not os.path.exists(HISTORY_FILE):
-        return {}
-    with open(HISTORY_FILE, "r") as f:
-        return json.load(f)
+def _history_path(unit_name):
+    # Without a ':' the unit name is the whole unit text, so keep a short
+    # readable prefix and make the name unique with a digest of the rest
+    safe_name = re.sub(r"[^\w\-]+", "_", unit_name).strip("_")[:40] or "unit"
+    digest = hashlib.blake2b(unit_name.encode(), digest_size=8).hexdigest()
+    return os.path.join(HISTORY_DIR, f"{safe_name}-{digest}.jsonl")
+
+def _import_legacy_history():
+    """
+    Copy hashes from the old single-file history into the per-unit files.
+    The old file is renamed afterwards, so this runs once.
+    """
+    if not os.path.exists(LEGACY_HISTORY_FILE):
+        return
+    with open(LEGACY_HISTORY_FILE, "rb") as f:
+        legacy = json_loads(f.read())
+    for unit_name, hashes in legacy.items():
+        if hashes:
+            save_history(unit_name, hashes)
+    os.replace(LEGACY_HISTORY_FILE, LEGACY_HISTORY_FILE + ".imported")
+
+@lru_cache(maxsize=128)
+def _read_history(path, mtime_ns, size):
+    # mtime/size are part of the cache key so any append invalidates it
+    with open(path, "rb") as f:
+        return frozenset(json_loads(line) for line in f if line.strip())
 
-def save_history(history):
-    with open(HISTORY_FILE, "w") as f:
-        json.dump(history, f)
+def load_history(unit_name):
+    """
+    Return the set of question hashes already used for a unit.
+    """
+    _import_legacy_history()
+    path = _history_path(unit_name)
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return frozenset()
+    return _read_history(path, stat.st_mtime_ns, stat.st_size)
 
-def hash_question(q):
-    return hashlib.sha256(q.strip().lower().encode()).hexdigest()
+def save_history(unit_name, new_hashes):
+    """
+    Append newly accepted question hashes to the unit's history file.
+    """
+    os.makedirs(HISTORY_DIR, exist_ok=True)
+    with open(_history_path(unit_name), "ab") as f:
+        f.write(b"".join(json_dumps(q_hash) + b"\n" for q_hash in new_hashes))
 
 # ---------------------------
 # API Call with Retry Logic
 # ---------------------------
 @retry_with_exponential_backoff
-def make_groq_api_call(body: dict):
+async def make_groq_api_call(client: httpx.AsyncClient, body: dict):
     """
     Make API call to Groq with built-in retry logic for rate limits.
     """
-    resp = requests.post(BASE_URL, headers=HEADERS, json=body, timeout=60)
+    await groq_rate_limiter.acquire()
+    resp = await client.post(BASE_URL, headers=HEADERS, json=body)
     if resp.status_code != 200:
         error_msg = resp.json().get("error", {}).get("message", resp.text)
+        if resp.status_code == 429:
+            raise RateLimitError.from_response(resp, error_msg)
         raise Exception(f"Groq API Error: {resp.status_code} - {error_msg}")
     return resp.json()
 
+# ---------------------------
+# Question numbering
+# ---------------------------
+def renumber_questions(questions_text: str, start_qno: int = 1):
+    """
+    Renumber "\n\n"-separated question blocks sequentially from start_qno.
+    """
+    renumbered = []
+    for i, q in enumerate(questions_text.split("\n\n"), start=start_qno):
+        # Extract question text (removing old Q1., Q2., etc.)
+        lines = q.split('\n')
+        question_lines = []
+        for line in lines:
+            if line.strip().startswith('Q'):
+                # Replace Q1., Q2., etc. with new number
+                parts = line.split('.', 1)
+                if len(parts) > 1:
+                    question_lines.append(f"Q{i}.{parts[1]}")
+                else:
+                    question_lines.append(f"Q{i}.")
+            else:
+                question_lines.append(line)
+        renumbered.append('\n'.join(question_lines))
+    
+    return '\n\n'.join(renumbered).strip()
+
 # ---------------------------
 # Generate one-mark questions per unit
 # ---------------------------
-def generate_one_mark_questions(full_content: str, unit: str, questions_per_unit: int, difficulty: str, start_qno: int = 1):
-    history = load_history()
+async def generate_one_mark_questions_async(client: httpx.AsyncClient, full_content: str, unit: str, questions_per_unit: int, difficulty: str, start_qno: int = 1):
     seed = random.randint(1000, 9999)
     
     # Extract only relevant content for this unit
     relevant_content = extract_relevant_content(full_content, unit)
     
-    # Get unit-specific history
     unit_name = unit.split(':')[0].strip()
-    unit_history = history.get(unit_name, [])
     
     system_msg = "You are an expert university question paper setter."
 
@@ -217,57 +243,74 @@ D. Option
 
     try:
         # Make API call with retry logic
-        data = make_groq_api_call(body)
+        data = await make_groq_api_call(client, body)
         raw_text = data["choices"][0]["message"]["content"]
         
+        # Load history only after the response arrives so it reflects any
+        # hashes saved while this request was in flight
+        unit_history = load_history(unit_name)
+        check_legacy = has_legacy_hashes(unit_history)
+        
         raw_questions = raw_text.strip().split("\n\n")
         final_questions = []
-        new_hashes = []
+        new_hashes = set()
         
         for q in raw_questions:
             if q.strip() and "Q" in q[:10]:  # Filter for actual questions
                 q_hash = hash_question(q)
-                # Check both unit history and global uniqueness
-                if q_hash not in unit_history:
+                # Check both unit history and this response (both O(1) set lookups)
+                if (q_hash not in unit_history and q_hash not in new_hashes
+                        and not (check_legacy and legacy_hash_question(q) in unit_history)):
                     final_questions.append(q)
-                    new_hashes.append(q_hash)
-                    unit_history.append(q_hash)
+                    new_hashes.add(q_hash)
             if len(final_questions) == questions_per_unit:
                 break
         
         if final_questions:
             # Update history
-            history[unit_name] = unit_history
-            save_history(history)
-        
-        # Reduced delay to 1.5 seconds between units
-        time.sleep(1.5)
+            save_history(unit_name, sorted(new_hashes))
         
         if not final_questions:
             return f"No new questions generated for {unit}. All were duplicates."
         
-        # Renumber questions sequentially
-        questions_text = ""
-        for i, q in enumerate(final_questions, start=start_qno):
-            # Extract question text (removing old Q1., Q2., etc.)
-            lines = q.split('\n')
-            question_lines = []
-            for line in lines:
-                if line.strip().startswith('Q'):
-                    # Replace Q1., Q2., etc. with new number
-                    parts = line.split('.', 1)
-                    if len(parts) > 1:
-                        question_lines.append(f"Q{i}.{parts[1]}")
-                    else:
-                        question_lines.append(f"Q{i}.")
-                else:
-                    question_lines.append(line)
-            questions_text += '\n'.join(question_lines) + '\n\n'
-        
-        return questions_text.strip()
+        return renumber_questions("\n\n".join(final_questions), start_qno)
         
-    except requests.exceptions.RequestException as e:
+    except httpx.HTTPError as e:
         raise Exception(f"Network error: {e}")
     except Exception as e:
         # For any other exception, raise it
-        raise Exception(f"Error generating questions for {unit_name}: {str(e)}")
\ No newline at end of file
+        raise Exception(f"Error generating questions for {unit_name}: {str(e)}")
+
+def generate_one_mark_questions(full_content: str, unit: str, questions_per_unit: int, difficulty: str, start_qno: int = 1):
+    """
+    Synchronous wrapper for generating one-mark questions for a single unit.
+    """
+    async def _run():
+        async with httpx.AsyncClient(timeout=60) as client:
+            return await generate_one_mark_questions_async(
+                client, full_content, unit, questions_per_unit, difficulty, start_qno
+            )
+    return asyncio.run(_run())
+
+async def generate_one_mark_questions_for_units(full_content: str, units: list, questions_per_unit: int, difficulty: str, concurrency: int = MAX_CONCURRENCY, client: httpx.AsyncClient = None):
+    """
+    Generate one-mark questions for all units concurrently.
+    Results come back in unit order, each numbered from Q1 (see
+    renumber_questions); a failed unit yields its exception instead.
+    Pass a shared client to reuse its pooled connections.
+    """
+    if client is None:
+        async with httpx.AsyncClient(timeout=60) as client:
+            return await generate_one_mark_questions_for_units(
+                full_content, units, questions_per_unit, difficulty, concurrency, client
+            )
+    
+    semaphore = asyncio.Semaphore(concurrency)
+    
+    async def _generate(unit):
+        async with semaphore:
+            return await generate_one_mark_questions_async(
+                client, full_content, unit, questions_per_unit, difficulty
+            )
+    
+    return await asyncio.gather(*(_generate(unit) for unit in units), return_exceptions=True)
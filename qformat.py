@@ -51,15 +51,26 @@ class QuestionPaper(FPDF):
         self.line(10, self.get_y(), 200, self.get_y())
         self.ln(4)
 
+# Unicode symbols the core PDF fonts cannot render
+_CHAR_REPLACEMENTS = str.maketrans({
+    "Δ": "Delta", "Σ": "Sigma", "Ω": "Omega", "Θ": "Theta", "π": "pi", 
+    "α": "alpha", "β": "beta", "γ": "gamma", "λ": "lambda", "μ": "mu",
+    "—": "-", "–": "-", "’": "'", "‘": "'", "“": '"', "”": '"', "…": "...",
+    "±": "+/-", "×": "x", "÷": "/", "≈": "~", "≠": "!=", "≤": "<=", "≥": ">="
+})
+
+_SKIP_KEYWORDS = ("UNIT", "PAGE", "TOTAL HOURS")
+_PAGE_HEADER_RE = re.compile(r'^\d+\s+EBCS22E24$')
+_PAGE_HEADER_PREFIX_RE = re.compile(r'^\d+\s+EBCS22E24\s*')
+_QNUM_RE = re.compile(r'^[Qq]\d+[\.\s]*')
+_MARKS_TAIL_RE = re.compile(r'\s*[\(\[]\s*\d+\s*(?:marks?\s*)?[\)\]]\s*$', re.IGNORECASE)
+_MARKS_INLINE_RE = re.compile(r'\s*[\(\[]\s*\d+\s*(?:marks?\s*)?[\)\]]', re.IGNORECASE)
+_NOTE_RE = re.compile(r'(This question requires|Note:|Expected).*$', re.IGNORECASE)
+_WS_RE = re.compile(r'\s+')
+_OPTION_RE = re.compile(r'^[a-dA-D1-4][\.\)\s]|^\([a-dA-D1-4]\)')
+
 def clean_text(text):
-    replacements = {
-        "Δ": "Delta", "Σ": "Sigma", "Ω": "Omega", "Θ": "Theta", "π": "pi", 
-        "α": "alpha", "β": "beta", "γ": "gamma", "λ": "lambda", "μ": "mu",
-        "—": "-", "–": "-", "’": "'", "‘": "'", "“": '"', "”": '"', "…": "...",
-        "±": "+/-", "×": "x", "÷": "/", "≈": "~", "≠": "!=", "≤": "<=", "≥": ">="
-    }
-    for char, rep in replacements.items():
-        text = text.replace(char, rep)
+    text = text.translate(_CHAR_REPLACEMENTS)
     
     lines = text.split('\n')
     filtered = []
@@ -67,17 +78,18 @@ def clean_text(text):
         clean = line.strip()
         if not clean: continue
         
-        if (any(keyword in clean.upper() for keyword in ["UNIT", "PAGE", "TOTAL HOURS"]) or
-            re.match(r'^\d+\s+EBCS22E24$', clean)):
+        upper = clean.upper()
+        if (any(keyword in upper for keyword in _SKIP_KEYWORDS) or
+            _PAGE_HEADER_RE.match(clean)):
             continue
         
         clean = clean.replace("7780.", "")
-        clean = re.sub(r'^\d+\s+EBCS22E24\s*', '', clean)
-        clean = re.sub(r'^[Qq]\d+[\.\s]*', '', clean)
-        clean = re.sub(r'\s*[\(\[]\s*\d+\s*(?:marks?\s*)?[\)\]]\s*$', '', clean, flags=re.IGNORECASE)
-        clean = re.sub(r'\s*[\(\[]\s*\d+\s*(?:marks?\s*)?[\)\]]', '', clean, flags=re.IGNORECASE)
-        clean = re.sub(r'(This question requires|Note:|Expected).*$', '', clean, flags=re.IGNORECASE)
-        clean = re.sub(r'\s+', ' ', clean).strip()
+        clean = _PAGE_HEADER_PREFIX_RE.sub('', clean)
+        clean = _QNUM_RE.sub('', clean)
+        clean = _MARKS_TAIL_RE.sub('', clean)
+        clean = _MARKS_INLINE_RE.sub('', clean)
+        clean = _NOTE_RE.sub('', clean)
+        clean = _WS_RE.sub(' ', clean).strip()
         
         if clean:
             filtered.append(clean)
@@ -125,7 +137,7 @@ def generate_pdf(sub_code, sub_name, session, content):
         if current_part == "A":
             # Detection for options starting with a, b, c, d or numbers 1, 2, 3, 4
             # matches "a.", "(a)", "a)", "1.", etc.
-            if re.match(r'^[a-dA-D1-4][\.\)\s]', line) or re.match(r'^\([a-dA-D1-4]\)', line):
+            if _OPTION_RE.match(line):
                 pdf.set_x(25) # More indentation for options
                 pdf.multi_cell(0, 5, line)
             else:
@@ -0,0 +1,122 @@
+# rate_limit.py
+import random
+import asyncio
+import threading
+import time
+from functools import wraps
+
+
+# ---------------------------
+# Rate limit errors
+# ---------------------------
+class RateLimitError(Exception):
+    """
+    Raised when Groq answers 429 Too Many Requests.
+    retry_after is the server's Retry-After delay in seconds, or None.
+    """
+
+    def __init__(self, message: str, retry_after: float = None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+    @classmethod
+    def from_response(cls, resp, error_msg: str):
+        try:
+            retry_after = float(resp.headers.get("Retry-After"))
+        except (TypeError, ValueError):  # missing, or an HTTP date
+            retry_after = None
+        return cls(f"Groq API Error: {resp.status_code} - {error_msg}", retry_after)
+
+
+# ---------------------------
+# Exponential Backoff Retry Decorator
+# ---------------------------
+def retry_with_exponential_backoff(
+    func=None,
+    initial_delay: float = 2.0,
+    exponential_base: float = 2.0,
+    jitter: bool = True,
+    max_retries: int = 5,
+    max_delay: float = 60.0,
+    errors_to_retry: tuple = (RateLimitError,)
+):
+    """
+    Exponential backoff decorator for handling API rate limits.
+    Wraps coroutine functions; retries sleep without blocking the event loop.
+    Only RateLimitError is retried, waiting for its Retry-After when given.
+    """
+    def decorator(func):
+        @wraps(func)
+        async def wrapper(*args, **kwargs):
+            delay = initial_delay
+            for i in range(max_retries + 1):  # +1 for the initial attempt
+                try:
+                    return await func(*args, **kwargs)
+                except errors_to_retry as e:
+                    # Out of attempts: re-raise
+                    if i == max_retries:
+                        raise e
+
+                    # Prefer the server's Retry-After, else back off with jitter
+                    sleep_time = getattr(e, "retry_after", None)
+                    if sleep_time is None:
+                        sleep_time = delay
+                        if jitter:
+                            sleep_time = delay * (0.5 + random.random())
+                    if sleep_time > max_delay:
+                        sleep_time = max_delay
+
+                    print(f"⚠️ Rate limit hit. Retrying in {sleep_time:.2f} seconds... (Attempt {i+1}/{max_retries})")
+                    await asyncio.sleep(sleep_time)
+
+                    # Increase delay for next retry
+                    delay *= exponential_base
+            return await func(*args, **kwargs)
+        return wrapper
+
+    if func is None:
+        return decorator
+    return decorator(func)
+
+
+# ---------------------------
+# Token Bucket Rate Limiter
+# ---------------------------
+class TokenBucketLimiter:
+    """
+    Client-side token bucket for pacing API requests.
+
+    Allows short bursts up to `burst` requests, then refills at
+    `max_calls` per `period` seconds. Callers only wait when the
+    bucket is empty, instead of sleeping after every request.
+    """
+
+    def __init__(self, max_calls: int, period: float = 60.0, burst: int = 5):
+        self.rate = max_calls / period
+        self.capacity = float(burst)
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        # A thread lock (not asyncio.Lock) keeps the limiter usable across
+        # the separate event loops created by each asyncio.run() call.
+        self._lock = threading.Lock()
+
+    def _reserve(self) -> float:
+        """Take one token and return how long the caller must wait for it."""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= 1
+            if self._tokens >= 0:
+                return 0.0
+            return -self._tokens / self.rate
+
+    async def acquire(self):
+        delay = self._reserve()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+
+# Shared by every module that calls Groq, since they use the same API key.
+# Groq enforces requests per minute, so a full minute's budget may burst.
+groq_rate_limiter = TokenBucketLimiter(max_calls=30, period=60.0, burst=30)